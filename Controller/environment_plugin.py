@@ -12,12 +12,14 @@
  See the License for the specific language governing permissions and
  limitations under the License."""
 
+import functools
 import math
 import random
 
-from mesa.space import MultiGrid
-from scipy.spatial import KDTree
+import numpy as np
+from scipy import ndimage
 from Controller.random_grid import RandomGrid
+from Model.grid import ResourceGrid, RESOURCE_BITS, resource_mask
 from Model.agents import (
     SquaredBlockedArea,
     CircledBlockedArea,
@@ -29,11 +31,41 @@ from Utils.utils import (
     set_guideline_cell,
     draw_line,
     within_bounds,
-    contains_any_resource,
     add_resource,
+    find_largest_blocked_area,
 )
 
 
+# The eight neighbors of a cell, without the cell itself
+NEIGHBORS_3X3 = np.ones((3, 3), dtype=bool)
+NEIGHBORS_3X3[1, 1] = False
+
+# The same neighborhood as (dx, dy) offsets, for the checks on a single cell
+NEIGHBOR_OFFSETS = tuple((dx - 1, dy - 1) for dx, dy in np.argwhere(NEIGHBORS_3X3).tolist())
+
+OPENING = RESOURCE_BITS[Opening]
+
+# Resource types that prevent an agent, or a blocked area, from being placed on a cell
+AGENT_BLOCKERS = resource_mask(
+    [IsolatedArea, SquaredBlockedArea, CircledBlockedArea, Opening, GuideLine]
+)
+
+
+@functools.lru_cache(maxsize=None)
+def disk_mask(radius):
+    """
+    Boolean mask of the cells within the given radius from the center of a (2r+1) x (2r+1) square.
+    The mask is cached per radius and read-only.
+
+    :param radius: The radius of the disk, in tassels.
+    :return: The disk mask, with the center at index (radius, radius).
+    """
+    xs, ys = np.ogrid[-radius:radius + 1, -radius:radius + 1]
+    mask = xs * xs + ys * ys <= radius * radius
+    mask.flags.writeable = False
+    return mask
+
+
 def build_squared_isolated_area(
         x_start,
         y_start,
@@ -92,10 +124,11 @@ def build_squared_isolated_area(
         )
 
     e_tassel = []
+    enclosure_set = set(enclosure_tassels)  # Constant-time membership for the neighbor checks
     # Remove points in the corners from enclosure_tassels
     for point in enclosure_tassels:
         for neighbor in grid.get_neighborhood(point, grid_width, grid_height):
-            if neighbor not in enclosure_tassels and dim_opening > 0:
+            if neighbor not in enclosure_set and dim_opening > 0:
                 e_tassel.append(point)
                 dim_opening -= 1
 
@@ -125,36 +158,63 @@ def circular_isolation(
     :param dim_opening: The dimension of the openings to be created.
     :param grid_width: The width of the grid.
     :param grid_height: The height of the grid.
-    :return: A random point in the isolated area to be used as an opening.
+    :return: A random point on the rim of the isolated area, or None if no rim cell lies in the grid.
     """
-    enclosure_tassels = []
-    for i in range(-radius, radius + 1):
-        for j in range(-radius, radius + 1):
-            if i ** 2 + j ** 2 <= radius ** 2:
-                p = (x_start + i, y_start + j)
-                if add_resource(grid, IsolatedArea(p), *p, grid_width, grid_height):
-                    if any(
-                            nb in enclosure_tassels
-                            for nb in grid.get_neighborhood(p, grid_width, grid_height, 1)
-                    ):
-                        enclosure_tassels.append(p)
-
-    if enclosure_tassels:
-        current_opening = random.choice(enclosure_tassels)
-        while dim_opening > 0:
-            index_current_opening = enclosure_tassels.index(current_opening)
-            next_openings = [
-                (index_current_opening + i) % len(enclosure_tassels) for i in [-1, 0, 1]
-            ]
-            current_opening = enclosure_tassels[random.choice(next_openings)]
-            add_resource(
-                grid,
-                Opening(current_opening),
-                *current_opening,
-                grid_width,
-                grid_height,
-            )
-            dim_opening -= 1
+    disk = disk_mask(radius)
+
+    # The offsets of the disk come from the cached mask, in row-major order
+    for i, j in (np.argwhere(disk) - radius).tolist():
+        p = (x_start + i, y_start + j)
+        add_resource(grid, IsolatedArea(p), *p, grid_width, grid_height)
+
+    # A cell lies on the rim of the disk when one of its four neighbors falls outside of it
+    padded = np.pad(disk, 1)
+    interior = (
+            disk
+            & padded[:-2, 1:-1]
+            & padded[2:, 1:-1]
+            & padded[1:-1, :-2]
+            & padded[1:-1, 2:]
+    )
+    rim = sorted(
+        (np.argwhere(disk & ~interior) - radius).tolist(),
+        key=lambda offset: math.atan2(offset[1], offset[0]),
+    )
+
+    # Rim cells inside the grid, ordered by angle so that consecutive cells are adjacent
+    enclosure_tassels = [
+        (x_start + i, y_start + j)
+        for i, j in rim
+        if within_bounds(grid_width, grid_height, (x_start + i, y_start + j))
+    ]
+
+    if not enclosure_tassels:
+        return None
+
+    # Walk along the rim from a random cell, opening one tassel per step. A rim clipped by the
+    # grid is no longer a closed loop, so the walk only moves to the rim cells next in the list
+    # that are also adjacent on the grid, and never jumps across the clipped part
+    count = len(enclosure_tassels)
+    index_current_opening = random.randrange(count)
+    while dim_opening > 0:
+        current_opening = enclosure_tassels[index_current_opening]
+        next_openings = [
+            k % count
+            for k in (index_current_opening - 1, index_current_opening, index_current_opening + 1)
+            if max(
+                abs(a - b) for a, b in zip(enclosure_tassels[k % count], current_opening)
+            ) <= 1
+        ]
+        index_current_opening = random.choice(next_openings)
+        current_opening = enclosure_tassels[index_current_opening]
+        add_resource(
+            grid,
+            Opening(current_opening),
+            *current_opening,
+            grid_width,
+            grid_height,
+        )
+        dim_opening -= 1
 
     return random.choice(enclosure_tassels)
 
@@ -235,27 +295,27 @@ def find_and_draw_lines(grid, neighbors, grid_width, grid_height):
     :param grid_height: The height of the grid.
     """
 
-    def find_perimeter_cells(width, height):
-        return [
-            (x, y)
-            for x in range(height)
-            for y in range(width)
-            if x in {0, height} or y in {0, width}
-        ]
-
-    def neighbor_on_the_perimeter(n, perimeter_cells):
-        perimeter_set = perimeter_cells
-        return any(neighbor in perimeter_set for neighbor in n)
-
-    perimeter_guidelines = find_perimeter_cells(grid_width, grid_height)
+    def nearest_perimeter_cell(cell):
+        """Return the distance to the perimeter and the perimeter cell closest to the given cell."""
+        x, y = cell
+        return min(
+            (x, (0, y)),
+            (grid_width - 1 - x, (grid_width - 1, y)),
+            (y, (x, 0)),
+            (grid_height - 1 - y, (x, grid_height - 1)),
+        )
 
-    if neighbors and not neighbor_on_the_perimeter(neighbors, perimeter_guidelines):
-        tree = KDTree(neighbors)
+    if neighbors:
+        # The perimeter is grid-aligned, so the closest perimeter cell of each neighbor
+        # is its projection on the nearest border and no spatial index is needed
         closest_neighbor, nearest_perimeter, min_distance = None, None, float("inf")
-        for pg_cell in perimeter_guidelines:
-            distance, index = tree.query(pg_cell)
+        for neighbor in neighbors:
+            distance, pg_cell = nearest_perimeter_cell(neighbor)
+            if distance == 0:
+                # A neighbor already lies on the perimeter
+                return
             if distance < min_distance:
-                closest_neighbor = neighbors[index]
+                closest_neighbor = neighbor
                 min_distance = distance
                 nearest_perimeter = pg_cell
 
@@ -291,25 +351,23 @@ def fill_circular_blocked_area(
     :param grid_height: The height of the grid.
     :param dim_tassel: Dimension tassel.
     """
-    blocked_tassels = []
-    for i in range(grid_height):  # Looping through x-coordinate range.
-        for j in range(grid_width):  # Looping through y-coordinate range.
-            dist = ((i - start_x) ** 2 + (j - start_y) ** 2) ** 0.5
-            if dist <= int(rad / dim_tassel):
-                point = (i, j)
-                new_resource = CircledBlockedArea(
-                    point
-                )  # Creating a new blocked area resource.
-
-                add_resource(
-                    grid,
-                    new_resource,
-                    point[0],
-                    point[1],
-                    grid_width,
-                    grid_height,
-                )
-                blocked_tassels.append(point)
+    # Clip the cached disk mask to the part of its bounding box that lies inside the grid
+    radius = int(rad / dim_tassel)
+    x_min, y_min = max(start_x - radius, 0), max(start_y - radius, 0)
+    x_max = min(start_x + radius + 1, grid_width)
+    y_max = min(start_y + radius + 1, grid_height)
+    inside = disk_mask(radius)[
+        x_min - start_x + radius:x_max - start_x + radius,
+        y_min - start_y + radius:y_max - start_y + radius,
+    ]
+    blocked_tassels = (
+        [(x_min + i, y_min + j) for i, j in np.argwhere(inside).tolist()]
+        if x_min < x_max and y_min < y_max
+        else []
+    )
+
+    # The cells are inside the grid, so the whole disk is placed in a single batch
+    grid.place_resources([CircledBlockedArea(point) for point in blocked_tassels])
 
     for bt in blocked_tassels:
         aux_lines(bt, grid, grid_width, grid_height)
@@ -346,38 +404,28 @@ def add_squared_area(
     rows = calculate_variance(min_height_blocked, max_height_blocked)
     num_rows = math.ceil((columns + min_width_blocked) / dim_tassel)
     num_columns = math.ceil((rows + min_height_blocked) / dim_tassel)
-    blocked_area = []
-    resources = set()
-
-    for j in range(num_rows):
-        tassel_x = coord_x + j
-        for i in range(num_columns):
-            tassel_y = coord_y + i
-            if (
-                    within_bounds(grid_width, grid_height, (tassel_x, tassel_y))
-                    and not is_near_opening(
-                grid, (tassel_x, tassel_y), grid_width, grid_height
-            )
-                    and (tassel_x, tassel_y) not in resources
-            ):
-                add_resource(
-                    grid,
-                    SquaredBlockedArea((tassel_x, tassel_y)),
-                    tassel_x,
-                    tassel_y,
-                    grid_width,
-                    grid_height,
-                )
-                resources.add((tassel_x, tassel_y))
-                blocked_area.append((tassel_x, tassel_y))
-
-    neighbors = []
-    for tassel in blocked_area:
-        for nb in grid.get_neighborhood(tassel, moore=True, include_center=False):
-            if nb not in blocked_area and not is_near_opening(
-                    grid, tassel, grid_width, grid_height
-            ):
-                neighbors.append((nb[0], nb[1]))
+
+    # Clip the rectangle to the grid and drop, in a single pass over the cell bitmasks,
+    # the cells that have an opening among their neighbors
+    x_min, y_min = max(coord_x, 0), max(coord_y, 0)
+    x_max = min(coord_x + num_rows, grid_width)
+    y_max = min(coord_y + num_columns, grid_height)
+    placeable = ~near_opening_mask(grid, x_min, x_max, y_min, y_max)
+    blocked_area = [
+        (x_min + i, y_min + j) for i, j in np.argwhere(placeable).tolist()
+    ]
+
+    # The cells are inside the grid, so the whole area is placed in a single batch
+    grid.place_resources([SquaredBlockedArea(tassel) for tassel in blocked_area])
+
+    # None of the blocked tassels is near an opening, so only the neighbors outside the area are kept
+    blocked_set = set(blocked_area)
+    neighbors = [
+        nb
+        for tassel in blocked_area
+        for nb in grid.get_neighborhood(tassel, moore=True, include_center=False)
+        if nb not in blocked_set
+    ]
 
     for neighbor in neighbors:
         set_guideline_cell(neighbor[0], neighbor[1], grid, grid_width, grid_height)
@@ -434,6 +482,27 @@ def aux_lines(blocked_area, grid, grid_width, grid_height):
     find_and_draw_lines(grid, neighbors, grid_width, grid_height)
 
 
+def near_opening_mask(grid, x_min, x_max, y_min, y_max):
+    """
+    Boolean mask of the cells of a window that have an opening among their neighbors.
+    Only the window and a margin of one cell around it are dilated, not the whole grid.
+
+    :param grid: The grid to check.
+    :param x_min: The first x-coordinate of the window.
+    :param x_max: The x-coordinate past the end of the window.
+    :param y_min: The first y-coordinate of the window.
+    :param y_max: The y-coordinate past the end of the window.
+    :return: A (x_max - x_min, y_max - y_min) mask, True on the cells near an opening.
+    """
+    pad_x, pad_y = max(x_min - 1, 0), max(y_min - 1, 0)
+    openings = (grid.type_map()[pad_x:x_max + 1, pad_y:y_max + 1] & OPENING) != 0
+    near_opening = ndimage.binary_dilation(openings, structure=NEIGHBORS_3X3)
+    return near_opening[
+        x_min - pad_x:x_max - pad_x,
+        y_min - pad_y:y_max - pad_y,
+    ]
+
+
 def is_near_opening(grid, point, grid_width, grid_height):
     """
     Check if a point is near an opening on the grid.
@@ -444,46 +513,38 @@ def is_near_opening(grid, point, grid_width, grid_height):
     :param grid_height: The height of the grid.
     :return: True if the point is near an opening, False otherwise.
     """
-    neighbors = grid.get_neighborhood(point, moore=True, include_center=False)
-    return any(
-        contains_any_resource(grid, nb, [Opening], grid_width, grid_height)
-        for nb in neighbors
-    )
+    x, y = point
+    # contains is bounds-checked, so the neighbors outside the grid are simply not openings
+    return any(grid.contains((x + dx, y + dy), OPENING) for dx, dy in NEIGHBOR_OFFSETS)
 
 
 def generate_valid_agent_position(grid, grid_width, grid_height, max_attempts=35):
     """
     Generate a valid position for an agent that is not blocked or near an opening.
+    Random cells are tried first; only when they keep failing are the valid cells
+    computed on the whole grid, so that a crowded grid still yields a position.
 
     :param grid: The grid where the position will be checked.
     :param grid_width: The width of the grid.
     :param grid_height: The height of the grid.
-    :param max_attempts: The maximum number of attempts to find a valid position.
+    :param max_attempts: The number of random cells to try before scanning the whole grid.
     :return: A tuple representing the valid position (x, y), or None if no valid position is found.
     """
-    blocked_types = [
-        IsolatedArea,
-        SquaredBlockedArea,
-        CircledBlockedArea,
-        Opening,
-        GuideLine,
-    ]
     for _ in range(max_attempts):
-        x, y = (random.randint(0, grid_height), random.randint(0, grid_width))
-
-        if (
-                within_bounds(grid_width, grid_height, (x, y))
-                and not contains_any_resource(
-            grid,
-            (x, y),
-            blocked_types,
-            grid_width,
-            grid_height,
-        )
-                and not is_near_opening(grid, (x, y), grid_width, grid_height)
+        pos = (random.randrange(grid_width), random.randrange(grid_height))
+        if not grid.contains(pos, AGENT_BLOCKERS) and not is_near_opening(
+                grid, pos, grid_width, grid_height
         ):
-            return x, y
-    return None
+            return pos
+
+    # Cells next to an opening are excluded along with the blocked ones
+    near_opening = near_opening_mask(grid, 0, grid_width, 0, grid_height)
+    free = np.flatnonzero(((grid.type_map() & AGENT_BLOCKERS) == 0) & ~near_opening)
+
+    # Sample among the valid cells directly, the flat index of (x, y) being x * grid_height + y
+    if free.size == 0:
+        return None
+    return divmod(int(free[random.randrange(free.size)]), grid_height)
 
 
 def populate_blocked_areas(
@@ -513,15 +574,11 @@ def populate_blocked_areas(
     :param grid_width: The width of the grid.
     :param grid_height: The height of the grid.
     :param dim_tassel: The dimension of each tassel.
-    :return: A list of coordinates representing the blocked areas.
     """
-    blocked_tassels = []
-    max_size = 0
-
     for _ in range(num_squares):
         pos = generate_valid_agent_position(grid, grid_width, grid_height)
         if pos:
-            blocked_tassels = add_squared_area(
+            add_squared_area(
                 pos[0],
                 pos[1],
                 min_width_blocked,
@@ -533,8 +590,6 @@ def populate_blocked_areas(
                 grid_height,
                 dim_tassel,
             )
-            if len(blocked_tassels) > max_size:
-                max_size = len(blocked_tassels)
 
     for _ in range(num_circles):
         pos = generate_valid_agent_position(grid, grid_width, grid_height)
@@ -543,9 +598,6 @@ def populate_blocked_areas(
                 pos[0], pos[1], ray, grid, grid_width, grid_height, dim_tassel
             )
 
-    if len(blocked_tassels) > 0:
-        return blocked_tassels
-
 
 class DefaultRandomGrid(RandomGrid):
     """
@@ -634,7 +686,7 @@ class DefaultRandomGrid(RandomGrid):
         self._num_blocked_circles = num_blocked_circles
         self._dim_tassel = dim_tassel
 
-        self._grid = MultiGrid(width, length, torus=False)
+        self._grid = ResourceGrid(width, length, torus=False)
 
     def begin(self):
         """
@@ -652,7 +704,7 @@ class DefaultRandomGrid(RandomGrid):
             self._radius,
         )
 
-        blocked_tassels = populate_blocked_areas(
+        populate_blocked_areas(
             self._grid,
             self._num_blocked_squares,
             self._num_blocked_circles,
@@ -666,7 +718,7 @@ class DefaultRandomGrid(RandomGrid):
             self._dim_tassel,
         )
 
-        return self._grid, random_corner, blocked_tassels
+        return self._grid, random_corner, find_largest_blocked_area(self._grid)
 
 
 def add_area(grid, t, tassels, opening_tassels, grid_width, grid_height):
@@ -739,7 +791,7 @@ class DefaultCreatedGrid(RandomGrid):
     def __init__(self, grid_width, grid_height, data_e, raw_shapes, dim_tassel):
         super().__init__(grid_width, grid_height)
         self.data_e = data_e
-        self.grid = MultiGrid(grid_width, grid_height, torus=False)
+        self.grid = ResourceGrid(grid_width, grid_height, torus=False)
         self.random_corner = (-1, -1)
         self.grid_width = grid_width
         self.grid_height = grid_height
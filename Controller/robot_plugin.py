@@ -12,6 +12,7 @@
  See the License for the specific language governing permissions and
  limitations under the License."""
 
+import functools
 import math
 import random
 from abc import ABC
@@ -24,13 +25,51 @@ from Model.agents import (
     Opening,
     GuideLine,
 )
+from Model.grid import resource_mask
 from Utils.utils import (
     within_bounds,
     get_grass_tassel,
     mowing_time,
-    contains_any_resource,
 )
 
+# Bitmasks of the resource types the movement checks look for
+BLOCKED = resource_mask([CircledBlockedArea, SquaredBlockedArea])
+ISOLATED = resource_mask([IsolatedArea])
+OPENING = resource_mask([Opening])
+GUIDELINE = resource_mask([GuideLine])
+
+
+def is_enclosed(grid, pos):
+    """
+    Checks whether a cell belongs to an isolated area without being one of its openings.
+
+    :param grid: The grid object representing the environment.
+    :param pos: Tuple representing the position of the cell.
+    :return: True if the cell is isolated and has no opening, False otherwise.
+    """
+    return grid.contains(pos, ISOLATED) and not grid.contains(pos, OPENING)
+
+
+@functools.lru_cache(maxsize=None)
+def cut_footprint(pos, radius, grid_width, grid_height):
+    """
+    Returns the cells covered by the blades when the mower stands on a cell, i.e. its Von Neumann
+    neighborhood, center included, clipped to the grid. The result is cached per position.
+
+    :param pos: Tuple representing the position of the mower.
+    :param radius: The radius of the cut, in tassels.
+    :param grid_width: The width of the grid.
+    :param grid_height: The height of the grid.
+    :return: Tuple of the positions covered by the cut.
+    """
+    x, y = pos
+    return tuple(
+        (x + dx, y + dy)
+        for dx in range(-radius, radius + 1)
+        for dy in range(-radius + abs(dx), radius - abs(dx) + 1)
+        if within_bounds(grid_width, grid_height, (x + dx, y + dy))
+    )
+
 
 def pass_on_tassels(pos, grid, diameter, grass_tassels, agent, dim_tassel):
     """
@@ -44,15 +83,11 @@ def pass_on_tassels(pos, grid, diameter, grass_tassels, agent, dim_tassel):
     :param dim_tassel: The dimension of each tassel.
     """
     radius = math.floor(diameter / 2)  # Calculate the radius for neighbor search
-    neighbors = grid.get_neighborhood(
-        pos, moore=False, include_center=True, radius=radius
-    )  # Get neighboring positions
 
-    for neighbor in neighbors:
-        if within_bounds(grid.width, grid.height, neighbor):
-            pass_on_current_tassel(
-                grass_tassels, neighbor, agent, diameter, dim_tassel
-            )  # Pass on the current tassel to the neighbor
+    for neighbor in cut_footprint(pos, radius, grid.width, grid.height):
+        pass_on_current_tassel(
+            grass_tassels, neighbor, agent, diameter, dim_tassel
+        )  # Pass on the current tassel to the neighbor
 
 
 def pass_on_current_tassel(grass_tassels, new_pos, agent, cut_diameter, dim_tassel):
@@ -112,6 +147,9 @@ class DefaultMovementPlugin(MovementPlugin, ABC):
         self.boing = boing  # Set the boing parameter
         self.cut_diameter = cut_diameter  # Set the cutting diameter
         self.dim_tassel = dim_tassel  # Set the tassel dimension
+        self.num_tass_back = math.ceil(
+            cut_diameter / dim_tassel
+        )  # Number of tassels to move back when bouncing
 
         self.directions = [  # Define the possible movement directions
             (0, 1),
@@ -174,27 +212,26 @@ class DefaultMovementPlugin(MovementPlugin, ABC):
         :param grass_tassels: The grass tassels object.
         """
         if agent.get_first():  # If it's the agent's first move
-            aux_pos = self.pos  # Get the current position
-            agent.dir = random.choice(self.directions)  # Choose a random direction
-            aux_pos = (
-                aux_pos[0] + agent.dir[0],
-                aux_pos[1] + agent.dir[1],
-            )  # Calculate the new position
-
-            while (  # While the new position is out of bounds or already in the path taken
-                    not within_bounds(self.grid_width, self.grid_height, aux_pos)
-                    or aux_pos in agent.path_taken
-            ):
-                aux_pos = self.pos  # Reset the position
-                agent.dir = random.choice(
-                    self.directions
-                )  # Choose a new random direction
-                aux_pos = (
-                    aux_pos[0] + agent.dir[0],
-                    aux_pos[1] + agent.dir[1],
-                )  # Calculate the new position
-            self.pos = aux_pos  # Update the current position
-            agent.path_taken.add(self.pos)  # Add the new position to the path taken
+            # Choose among the directions leading to an unvisited cell inside the grid
+            # instead of drawing directions until one of them is valid
+            candidates = [
+                direction
+                for direction in self.directions
+                if within_bounds(
+                    self.grid_width,
+                    self.grid_height,
+                    (self.pos[0] + direction[0], self.pos[1] + direction[1]),
+                )
+                and (self.pos[0] + direction[0], self.pos[1] + direction[1])
+                not in agent.path_taken
+            ]
+            agent.dir = random.choice(candidates or self.directions)  # Choose a random direction
+            if candidates:  # If there is somewhere to go, take the first step
+                self.pos = (
+                    self.pos[0] + agent.dir[0],
+                    self.pos[1] + agent.dir[1],
+                )  # Update the current position
+                agent.path_taken.add(self.pos)  # Add the new position to the path taken
             agent.not_first()  # Mark that the first move is complete
 
         agent.dx = self.dx_tassel[
@@ -212,23 +249,15 @@ class DefaultMovementPlugin(MovementPlugin, ABC):
                     self.grid_width,
                     self.grid_height,
                     (self.pos[0] + agent.dir[0], self.pos[1] + agent.dir[1]),
-            ) and not contains_any_resource(  # And the next position doesn't contain any resources
-                self.grid,
-                (self.pos[0] + agent.dir[0], self.pos[1] + agent.dir[1]),
-                [CircledBlockedArea, SquaredBlockedArea],
-                self.grid_width,
-                self.grid_height,
+            ) and not self.grid.contains(  # And the next position doesn't contain any resources
+                (self.pos[0] + agent.dir[0], self.pos[1] + agent.dir[1]), BLOCKED
             ):
                 if (  # If the current position is not isolated without an opening or is a guideline
-                        not (
-                                IsolatedArea in self.grid.get_cell_list_contents(self.pos)
-                                and Opening not in self.grid.get_cell_list_contents(self.pos)
+                        not is_enclosed(self.grid, self.pos)
+                        or self.grid.contains(
+                            (self.pos[0] + agent.dx[0], self.pos[1] + agent.dx[1]), GUIDELINE
                         )
-                        or GuideLine in self.grid.get_cell_list_contents(agent.dx)
-                        and CircledBlockedArea
-                        not in self.grid.get_cell_list_contents(self.pos)
-                        and SquaredBlockedArea
-                        not in self.grid.get_cell_list_contents(self.pos)
+                        and not self.grid.contains(self.pos, BLOCKED)
                 ):
                     if (
                             self.pos not in agent.path_taken
@@ -246,41 +275,24 @@ class DefaultMovementPlugin(MovementPlugin, ABC):
                             self.dim_tassel,
                         )
                     else:  # If the position is already in the path taken
-                        aux_pos = self.pos  # Reset the position
-                        agent.dir = random.choice(
-                            self.directions
-                        )  # Choose a new random direction
-                        aux_pos = (
-                            aux_pos[0] + agent.dir[0],
-                            aux_pos[1] + agent.dir[1],
-                        )  # Calculate the new position
-
-                        while (  # While the new position is out of bounds, contains resources, or is isolated
-                                not within_bounds(
-                                self.grid_width, self.grid_height, aux_pos
-                                )
-                                or contains_any_resource(
-                            self.grid,
-                            aux_pos,
-                            [CircledBlockedArea, SquaredBlockedArea],
-                            self.grid_width,
-                            self.grid_height,
-                        )
-                                or (
-                                        IsolatedArea
-                                        in self.grid.get_cell_list_contents(self.pos)
-                                        and Opening
-                                        not in self.grid.get_cell_list_contents(self.pos)
-                                )
-                        ):
-                            aux_pos = self.pos  # Reset the position
-                            agent.dir = random.choice(
-                                self.directions
-                            )  # Choose a new random direction
+                        # Try the directions in random order and keep the first one leading to a free cell
+                        directions = random.sample(self.directions, len(self.directions))
+                        for direction in directions:
                             aux_pos = (
-                                aux_pos[0] + agent.dir[0],
-                                aux_pos[1] + agent.dir[1],
+                                self.pos[0] + direction[0],
+                                self.pos[1] + direction[1],
                             )  # Calculate the new position
+                            if (  # If the new position is in bounds, free and not isolated
+                                    within_bounds(self.grid_width, self.grid_height, aux_pos)
+                                    and not self.grid.contains(aux_pos, BLOCKED)
+                                    and not is_enclosed(self.grid, aux_pos)
+                            ):
+                                break
+                        else:  # If every direction is blocked
+                            self.bounce(agent, grass_tassels)  # Bounce the agent
+                            return
+
+                        agent.dir = direction  # Update the direction
                         self.pos = aux_pos  # Update the current position
 
                         self.grid.move_agent(
@@ -313,21 +325,14 @@ class DefaultMovementPlugin(MovementPlugin, ABC):
         :param agent: The agent to be moved.
         :param grass_tassels: The grass tassels object.
         """
-        num_tass_back = math.ceil(
-            self.cut_diameter / self.dim_tassel
-        )  # Calculate the number of tassels to move back
-        for _ in range(num_tass_back):  # For each tassel to move back
+        for _ in range(self.num_tass_back):  # For each tassel to move back
             aux_pos = (self.pos[0] - agent.dir[0]), (
                     self.pos[1] - agent.dir[1]
             )  # Calculate the new position
             if (  # If the new position is within bounds and doesn't contain blocked areas
                     within_bounds(self.grid_width, self.grid_height, aux_pos)
-                    and SquaredBlockedArea not in self.grid.get_cell_list_contents(aux_pos)
-                    and CircledBlockedArea not in self.grid.get_cell_list_contents(aux_pos)
-                    and not (
-                    IsolatedArea in self.grid.get_cell_list_contents(aux_pos)
-                    and Opening not in self.grid.get_cell_list_contents(aux_pos)
-            )
+                    and not self.grid.contains(aux_pos, BLOCKED)
+                    and not is_enclosed(self.grid, aux_pos)
             ):
                 self.pos = aux_pos
                 pass_on_tassels(
@@ -131,31 +131,35 @@ class Robot(Agent):
 class GrassTassel:
     """
     A GrassTassel agent that represents a single grass tassel.
+    The cut count is stored in an array shared by all the tassels of a model,
+    indexed by the position of the tassel.
 
     :param pos: Position of the grass tassel.
+    :param counts: Array of cut counts shared by the grass tassels.
+    :type counts: numpy.ndarray
     """
 
-    def __init__(self, pos):
-        self.cut = -1  # Number of times the grass tassel has been cut
+    __slots__ = ("pos", "counts")
+
+    def __init__(self, pos, counts):
         self.pos = pos  # Position of the grass tassel
+        self.counts = counts  # Cut counts of the whole grid
 
     def increment(self):
         """
         Increment the cut count.
         """
-        if self.cut == -1:
-            self.cut = 1
-        else:
-            self.cut += 1
+        self.counts[self.pos] += 1
 
     def get_counts(self):
         """
         Get the number of times the grass tassel has been cut.
 
-        :return: Cut count.
+        :return: Cut count, or -1 if the grass tassel has never been cut.
         :rtype: int
         """
-        return self.cut
+        cut = int(self.counts[self.pos])
+        return cut if cut > 0 else -1
 
     def get(self):
         """
@@ -181,6 +185,8 @@ class IsolatedArea:
     :type pos: tuple or list
     """
 
+    __slots__ = ("pos",)
+
     def __init__(self, pos):
         self.pos = pos
 
@@ -202,6 +208,8 @@ class Opening:
     :type pos: tuple or list
     """
 
+    __slots__ = ("pos",)
+
     def __init__(self, pos):
         self.pos = pos
 
@@ -222,6 +230,8 @@ class BaseStation:
     :param pos: Position of the base station.
     """
 
+    __slots__ = ("pos",)
+
     def __init__(self, pos):
         self.pos = pos
 
@@ -249,6 +259,8 @@ class SquaredBlockedArea:
     :type pos: tuple or list
     """
 
+    __slots__ = ("pos",)
+
     def __init__(self, pos):
         self.pos = pos
 
@@ -270,6 +282,8 @@ class CircledBlockedArea:
     :type pos: tuple or list
     """
 
+    __slots__ = ("pos",)
+
     def __init__(self, pos):
         self.pos = pos
 
@@ -281,6 +295,8 @@ class GuideLine:
     :param pos: Position of the guideline.
     """
 
+    __slots__ = ("pos",)
+
     def __init__(self, pos):
         self.pos = pos
 
@@ -0,0 +1,151 @@
+""" Copyright 2024 Sara Grecu
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+     https://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License."""
+
+import functools
+
+import numpy as np
+from mesa.space import MultiGrid
+
+from Model.agents import (
+    BaseStation,
+    GuideLine,
+    GrassTassel,
+    SquaredBlockedArea,
+    CircledBlockedArea,
+    IsolatedArea,
+    Opening,
+)
+
+# One bit per resource type that can be queried on a cell
+RESOURCE_BITS = {
+    BaseStation: 1,
+    GuideLine: 2,
+    GrassTassel: 4,
+    SquaredBlockedArea: 8,
+    CircledBlockedArea: 16,
+    IsolatedArea: 32,
+    Opening: 64,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def resource_bit(resource_type):
+    """
+    Return the bit of a resource type. Subclasses inherit the bit of the nearest
+    resource type in their MRO, like an isinstance check would.
+
+    :param resource_type: A class.
+    :return: The bit of the resource type, or 0 if it is not a resource type.
+    """
+    for base in resource_type.__mro__:
+        if base in RESOURCE_BITS:
+            return RESOURCE_BITS[base]
+    return 0
+
+
+def resource_mask(resource_types):
+    """
+    Combine the bits of several resource types into a single mask.
+
+    :param resource_types: Iterable of resource classes.
+    :return: The bitwise OR of the bits of the given resource types.
+    """
+    mask = 0
+    for rtype in resource_types:
+        mask |= resource_bit(rtype)
+    return mask
+
+
+class ResourceGrid(MultiGrid):
+    """
+    A MultiGrid that keeps, for every cell, a bitmask of the resource types it contains,
+    so that resource lookups do not have to scan the cell contents.
+    The bitmasks are stored in a flat array where the cell (x, y) is at index x * height + y.
+
+    :param width: The width of the grid.
+    :type width: int
+    :param height: The height of the grid.
+    :type height: int
+    :param torus: Whether the grid wraps around its edges.
+    :type torus: bool
+    """
+
+    def __init__(self, width, height, torus):
+        super().__init__(width, height, torus)
+        self.cell_types = np.zeros(width * height, dtype=np.uint16)
+
+    def place_agent(self, agent, pos):
+        """
+        Place an agent on the grid and record its type in the cell bitmask.
+
+        :param agent: The agent or resource to place.
+        :param pos: The (x, y) position of the cell.
+        """
+        super().place_agent(agent, pos)
+        bit = resource_bit(type(agent))
+        if bit:
+            x, y = pos
+            self.cell_types[x * self.height + y] |= bit
+
+    def place_resources(self, resources):
+        """
+        Place many new resources at once, each one on the cell stored in its pos,
+        and record their types in the cell bitmasks with a single array update.
+        Mesa's own bookkeeping is left to MultiGrid.place_agent.
+
+        :param resources: List of resources whose pos is already set.
+        """
+        cells = np.empty(len(resources), dtype=np.intp)
+        bits = np.empty(len(resources), dtype=self.cell_types.dtype)
+        for k, resource in enumerate(resources):
+            x, y = resource.pos
+            super().place_agent(resource, (x, y))
+            cells[k] = x * self.height + y
+            bits[k] = resource_bit(type(resource))
+        np.bitwise_or.at(self.cell_types, cells, bits)
+
+    def remove_agent(self, agent):
+        """
+        Remove an agent from the grid and rebuild the bitmask of its former cell.
+
+        :param agent: The agent or resource to remove.
+        """
+        pos = agent.pos
+        super().remove_agent(agent)
+        if resource_bit(type(agent)):
+            x, y = pos
+            self.cell_types[x * self.height + y] = resource_mask(
+                type(content) for content in self[x][y]
+            )
+
+    def contains(self, pos, mask):
+        """
+        Check whether a cell holds any of the resource types in the given mask.
+
+        :param pos: The (x, y) position of the cell.
+        :param mask: A bitmask built with resource_mask.
+        :return: True if at least one of the resource types is present, False otherwise.
+        """
+        x, y = pos
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        return (int(self.cell_types[x * self.height + y]) & mask) != 0
+
+    def type_map(self):
+        """
+        Return a view of the cell bitmasks as a (width, height) array indexed by [x, y].
+
+        :return: The two-dimensional view of the cell bitmasks.
+        """
+        return self.cell_types.reshape(self.width, self.height)
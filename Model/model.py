@@ -27,6 +27,7 @@ from Model.agents import (
     SquaredBlockedArea,
     CircledBlockedArea,
 )
+from Model.grid import resource_mask
 
 
 class Simulator(mesa.Model):
@@ -62,12 +63,13 @@ class Simulator(mesa.Model):
         :param dim_tassel: The dimension of the grass tassel.
         """
         super().__init__()
-        self.schedule = mesa.time.StagedActivation(self)
+        self.schedule = mesa.time.BaseScheduler(self)
         self.grid = grid
         self.cycles = cycles
         self.speed = speed
         self.base_station_pos = base_station_pos
-        self.grass_tassels = []
+        self.grass_tassels = {}  # Grass tassels keyed by their position
+        self.grass_counts = np.zeros((grid.width, grid.height), dtype=np.int32)  # Cut counts of every cell
         self.robot = None
         self.dim_tassel = dim_tassel
         self.initialize_grass_tassels()
@@ -82,18 +84,15 @@ class Simulator(mesa.Model):
 
     def initialize_grass_tassels(self):
         """Initialize the grass tassels and place them in the grid."""
-        cord_iter = self.grid.coord_iter()
-        for contents, (x, y) in cord_iter:
-            if (
-                    GrassTassel not in contents
-                    and SquaredBlockedArea not in contents
-                    and CircledBlockedArea not in contents
-            ):
-                # Place a new grass tassel if the cell is not blocked or already occupied by another grass tassel
-                pos = (x, y)
-                new_grass = GrassTassel(pos)
-                self.grass_tassels.append(new_grass)
-                self.grid.place_agent(new_grass, pos)
+        # Select, in a single pass over the cell bitmasks, the cells that are not blocked
+        # nor already occupied by another grass tassel
+        occupied = resource_mask([GrassTassel, SquaredBlockedArea, CircledBlockedArea])
+        free = (self.grid.type_map() & occupied) == 0
+
+        # Create all the tassels first and place them on the grid in a single batch
+        new_grass = [GrassTassel((x, y), self.grass_counts) for x, y in np.argwhere(free).tolist()]
+        self.grass_tassels.update((grass.pos, grass) for grass in new_grass)
+        self.grid.place_resources(new_grass)
 
     def initialize_robot(self, robot_plugin, autonomy, base_station_pos):
         """
@@ -143,12 +142,8 @@ class Simulator(mesa.Model):
 
         :param cycle: The current cycle number.
         """
-        counts = [[0 for _ in range(self.grid.height)] for _ in range(self.grid.width)]
-
-        for grass_tassel in self.grass_tassels:
-            x, y = grass_tassel.get()
-            if grass_tassel.get_counts() > 0:
-                counts[x][y] = grass_tassel.get_counts()
+        # The tassels write their cuts straight into the shared counts array
+        counts = self.grass_counts.copy()
 
         # Create a DataFrame to store the counts
         df = pd.DataFrame(counts)
@@ -180,7 +175,7 @@ class Simulator(mesa.Model):
         # Create a heatmap of the counts
         fig, ax = plt.subplots()
         ax.xaxis.tick_top()  # Place x-axis ticks at the top
-        maximum = max(max(sublist) for sublist in counts)
+        maximum = int(counts.max())
 
         sns.heatmap(
             data=counts,
@@ -199,14 +194,14 @@ class Simulator(mesa.Model):
             "%Y-%m-%d_%H:%M:%S"
         )  # Generate a timestamp for the filename
         file_path = os.path.join(
-            output_dir, f"heatmap_{timestamp}_cycle_{cycle}.png"
+            output_dir, f"heatmap_{timestamp}_{self.i}_{self.j}_cycle_{cycle}.png"
         )  # Define the file path
 
         plt.savefig(file_path)  # Save the heatmap as a PNG file
         plt.close(fig)  # Close the figure
 
         # Flatten the array (in case of multidimensional data)
-        flattened_counts = np.array(counts).flatten()
+        flattened_counts = counts.ravel()
 
         # Create the figure and axis objects
         fig, ax = plt.subplots()
@@ -239,7 +234,7 @@ class Simulator(mesa.Model):
         plt.tight_layout()
 
         # Save the plot as a PNG file (uncomment and modify path to use)
-        plt.savefig(os.path.join(output_dir, f"hist_{timestamp}_cycle_{cycle}.png"))
+        plt.savefig(os.path.join(output_dir, f"hist_{timestamp}_{self.i}_{self.j}_cycle_{cycle}.png"))
 
         # Display the plot
         # plt.show()
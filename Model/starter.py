@@ -18,6 +18,7 @@ import logging
 import math
 import os
 import random
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
 import pandas as pd
@@ -34,17 +35,17 @@ from Utils.utils import (
 
 def _initialize_plugins(plugin_names):
     """
-    Dynamically import and instantiate plugin classes.
+    Dynamically import plugin classes. They are instantiated later, once the grid
+    they work on is known.
 
-    :param plugin_names: List of plugin class names to import and instantiate.
-    :return: List of initialized plugin instances.
+    :param plugin_names: List of plugin class names to import.
+    :return: List of plugin classes.
     """
     plugins = []
     for name in plugin_names:
         try:
-            module = importlib.import_module(f"./Controller/{name}")
-            plugin_class = getattr(module, name)
-            plugins.append(plugin_class())
+            module = importlib.import_module(f"Controller.{name}")
+            plugins.append(getattr(module, name))
         except ImportError as e:
             logging.error(f"Error importing plugin '{name}': {e}")
     return plugins
@@ -160,11 +161,14 @@ def process_grid_data(
     :param dim_tassel: Dimension of each tassel.
     :param grid: The grid to process.
     """
-    external_data = [["" for _ in range(grid_height)] for _ in range(grid_width)]
-
-    for x in range(grid_width):
-        for y in range(grid_height):
-            external_data[x][y] = grid.get_cell_list_contents((x, y))
+    # Read each column of the grid directly instead of querying cell by cell
+    external_data = [
+        [
+            [type(agent).__name__ for agent in cell]
+            for cell in grid[x]
+        ]
+        for x in range(grid_width)
+    ]
 
     df = pd.DataFrame(external_data)
     df = df.rename(columns={j: j * dim_tassel for j in range(grid_height)})
@@ -243,6 +247,21 @@ def runner(
     cycle_data.append(current_data)
 
 
+def _run_repetition(job):
+    """
+    Run a single repetition of the simulation, in a worker process.
+
+    :param job: Tuple with the random seed of the repetition and the keyword arguments of runner,
+        except for the cycle data.
+    :return: The cycle data collected during the repetition.
+    """
+    seed, runner_kwargs = job
+    random.seed(seed)
+    cycle_data = []
+    runner(cycle_data=cycle_data, **runner_kwargs)
+    return cycle_data
+
+
 def run_model_with_parameters(env_plugins, robot_plugin):
     """
     Run the simulation model with the given plugins.
@@ -260,8 +279,13 @@ def run_model_with_parameters(env_plugins, robot_plugin):
     grid_height = math.ceil(data_e["length"] / dim_tassel)
     recharge = data_r["recharge"]
 
-    # Set random seed for reproducibility
-    random.seed(random.randint(0, grid_width * grid_height))
+    # Set random seed for reproducibility, taken from the simulator data when given
+    seed = data_s.get("seed", random.randint(0, grid_width * grid_height))
+    random.seed(seed)
+
+    # The repetitions draw their seeds from a separate generator, seeded differently from the
+    # global one so that the two streams do not replay each other
+    repetition_seeds = random.Random(f"{seed}-repetitions")
 
     for i in range(num_maps):
         cycle_data = []
@@ -294,12 +318,35 @@ def run_model_with_parameters(env_plugins, robot_plugin):
         # Create copies of the grid for different strategies
         grids = [copy.deepcopy(grid) for _ in range(3)]
 
-        for j in range(repetitions):
-            # Run the experiment with the specified strategy.
-            runner(robot_plugin, grids[0], cycles, (0, int(grid_height / 3)), data_r, grid_width, grid_height, i, j,
-                   cycle_data, f"perimeter_model{get_current_datetime()}.csv", dim_tassel, recharge)
+        # The repetitions are independent: each one gets its own copy of the grid and its own seed
+        jobs = [
+            (
+                repetition_seeds.randrange(2 ** 32),
+                dict(
+                    robot_plugin=robot_plugin,
+                    grid=grids[0],
+                    cycles=cycles,
+                    base_station_pos=(0, int(grid_height / 3)),
+                    data_r=data_r,
+                    grid_width=grid_width,
+                    grid_height=grid_height,
+                    i=i,
+                    j=j,
+                    filename=f"perimeter_model{get_current_datetime()}_{j}.csv",
+                    dim_tassel=dim_tassel,
+                    recharge=recharge,
+                ),
+            )
+            for j in range(repetitions)
+        ]
 
-            """
+        # Run the experiment with the specified strategy, one repetition per worker process.
+        with ProcessPoolExecutor(max_workers=max(1, min(repetitions, os.cpu_count() or 1))) as executor:
+            for repetition_data in executor.map(_run_repetition, jobs):
+                cycle_data.extend(repetition_data)
+
+        """
+        for j in range(repetitions):
             # List of active strategies for base station placement.
             # Uncomment if needed.
             strategies = [
@@ -13,13 +13,18 @@
  limitations under the License."""
 
 import cProfile
+import functools
 import json
+import logging
 import math
 import os
 import pstats
 import random
 from io import StringIO
-from typing import Union, Tuple, Set, List
+from typing import Union, Tuple, Set, List, NamedTuple
+
+import numpy as np
+from scipy import ndimage
 
 from Model.agents import (
     BaseStation,
@@ -28,7 +33,15 @@ from Model.agents import (
     CircledBlockedArea,
     IsolatedArea,
 )
+from Model.grid import resource_mask
+
+# Resource types that prevent a guideline from being drawn on a cell
+GUIDELINE_BLOCKERS = resource_mask(
+    [CircledBlockedArea, SquaredBlockedArea, IsolatedArea, BaseStation, GuideLine]
+)
 
+# Resource types that prevent a base station from being placed on a cell
+STATION_BLOCKERS = resource_mask([SquaredBlockedArea, CircledBlockedArea, IsolatedArea])
 
 
 def validate_and_adjust_base_station(coords, grid_width, grid_height, grid):
@@ -46,13 +59,7 @@ def validate_and_adjust_base_station(coords, grid_width, grid_height, grid):
     if (
             coords is None
             or not within_bounds(grid_width, grid_height, coords)
-            or contains_any_resource(
-        grid,
-        coords,
-        [SquaredBlockedArea, CircledBlockedArea, IsolatedArea],
-        grid_width,
-        grid_height,
-    )
+            or grid.contains(coords, STATION_BLOCKERS)
     ):
 
         def maybe_move_to_adjacent_valid_tile():
@@ -67,17 +74,12 @@ def validate_and_adjust_base_station(coords, grid_width, grid_height, grid):
                 (0, 1),
             )
             for dx, dy in offsets:
-                new_x, new_y = x + dx, y + dy
-                if within_bounds(
-                        grid_width, grid_height, (new_x, new_y)
-                ) and not contains_any_resource(
-                    grid,
-                    coords,
-                    [SquaredBlockedArea, CircledBlockedArea, IsolatedArea],
-                    grid_width,
-                    grid_height,
+                new_pos = (x + dx, y + dy)
+                # The adjacent tile itself must be free, not the rejected one
+                if within_bounds(grid_width, grid_height, new_pos) and not grid.contains(
+                        new_pos, STATION_BLOCKERS
                 ):
-                    return new_x, new_y
+                    return new_pos
             return coords
 
         return maybe_move_to_adjacent_valid_tile()
@@ -88,71 +90,56 @@ def validate_and_adjust_base_station(coords, grid_width, grid_height, grid):
 def perimeter_try_generating_base_station(
         grid_width,
         grid_height,
-        base_station,
         grid,
 ) -> Tuple[int, int]:
     """
-    Attempts to generate a valid base station at the perimeter of the grid. It tries
-    repeatedly until valid coordinates are found.
+    Generates a candidate base station at the perimeter of the grid and validates it.
 
     :param grid_width: Width of the grid.
     :param grid_height: Height of the grid.
-    :param base_station: Initial base station coordinates (None if not generated).
     :param grid: The grid where the base station is placed.
     :return: Coordinates of the base station (tuple of x, y).
     """
     def generate_perimeter_pair(width: int, length: int) -> Tuple[int, int]:
+        # A random cell of the left or the top edge of the grid
         return (
-            (0, random.randint(0, width))
-            if random.choice([0, 1]) == 0
-            else (random.randint(0, length), 0)
+            (0, random.randrange(length))
+            if random.getrandbits(1)
+            else (random.randrange(width), 0)
         )
 
-    while base_station is None:
-        try:
-            tmp_bs = generate_perimeter_pair(grid_width, grid_height)
-            base_station = validate_and_adjust_base_station(
-                tmp_bs, grid_width, grid_height, grid
-            )
-        except ValueError:
-            base_station = None
-    return base_station
+    return validate_and_adjust_base_station(
+        generate_perimeter_pair(grid_width, grid_height), grid_width, grid_height, grid
+    )
 
 
 def big_center_try_generating_base_station(
         center_tassel,
         grid_width,
         grid_height,
-        base_station,
         biggest_blocked_area,
         grid,
 ):
     """
-    Attempts to generate a base station near the center of the largest blocked area.
+    Generates a base station near the center of the largest blocked area.
 
     :param center_tassel: Coordinates of the central tassel (tuple of x, y).
     :param grid_width: Width of the grid.
     :param grid_height: Height of the grid.
-    :param base_station: Initial base station coordinates (None if not generated).
     :param biggest_blocked_area: Coordinates of the largest blocked area.
     :param grid: The grid where the base station is placed.
-    :return: Coordinates of the base station (tuple of x, y) or None if not found.
+    :return: Coordinates of the base station (tuple of x, y) or None if there is no blocked area.
     """
-    if biggest_blocked_area:
-        while base_station is None:
-            try:
-                tmp_bs = generate_biggest_center_pair(
-                    center_tassel, biggest_blocked_area
-                )
-                base_station = validate_and_adjust_base_station(
-                    tmp_bs, grid_width, grid_height, grid
-                )
-            except ValueError:
-                base_station = None
-        return base_station
-    else:
+    if not biggest_blocked_area:
         return None
 
+    return validate_and_adjust_base_station(
+        generate_biggest_center_pair(center_tassel, biggest_blocked_area),
+        grid_width,
+        grid_height,
+        grid,
+    )
+
 
 class StationGuidelinesStrategy:
     """
@@ -189,17 +176,16 @@ class PerimeterPairStrategy(StationGuidelinesStrategy):
         :param grid_height: Height of the grid.
         :return: Coordinates of the base station (tuple of x, y) or None if not found.
         """
-        base_station = None
         attempt_limit = 35
 
         for _ in range(attempt_limit):
             base_station = perimeter_try_generating_base_station(
-                grid_width, grid_height, base_station, grid
+                grid_width, grid_height, grid
             )
             if base_station is not None and add_base_station(
                     grid, base_station, grid_width, grid_height
             ):
-                print(f"BASE STATION: {base_station}")
+                logging.debug("BASE STATION: %s", base_station)
                 return base_station
         return None
 
@@ -222,28 +208,18 @@ class BiggestRandomPairStrategy(StationGuidelinesStrategy):
         :return: Coordinates of the base station (tuple of x, y) or None if not found.
         """
 
-        base_station = None
         attempt_limit = 35
 
         def generate_biggest_pair(bba):
-            random_choice = random.choice(bba) if bba else None
-            print(f"RANDOM CHOICE {random_choice}")
+            random_choice = random.choice(bba)
+            logging.debug("RANDOM CHOICE %s", random_choice)
             return random_choice
 
-        def big_random_try_generating_base_station(bs):
-            while bs is None:
-                try:
-                    tmp_bs = generate_biggest_pair(biggest_blocked_area)
-                    bs = validate_and_adjust_base_station(
-                        tmp_bs, grid_width, grid_height, grid
-                    )
-                except ValueError:
-                    bs = None
-            return bs
-
         if biggest_blocked_area:
             for _ in range(attempt_limit):
-                base_station = big_random_try_generating_base_station(base_station)
+                base_station = validate_and_adjust_base_station(
+                    generate_biggest_pair(biggest_blocked_area), grid_width, grid_height, grid
+                )
                 if base_station is not None and add_base_station(
                         grid, base_station, grid_width, grid_height
                 ):
@@ -257,36 +233,36 @@ class BiggestCenterPairStrategy(StationGuidelinesStrategy):
     def locate_base_station(
             self, grid, center_tassel, biggest_blocked_area, grid_width, grid_height
     ) -> Union[Tuple[int, int], None]:
-        base_station = None
-        attempt_limit = 35
-
-        for _ in range(attempt_limit):
-            base_station = big_center_try_generating_base_station(
-                center_tassel,
-                grid_width,
-                grid_height,
-                base_station,
-                biggest_blocked_area,
-                grid,
-            )
-            if base_station is not None and add_base_station(
-                    grid, base_station, grid_width, grid_height
-            ):
-                return base_station
+        # The nearest tassel to the center is deterministic, so a single attempt suffices
+        base_station = big_center_try_generating_base_station(
+            center_tassel,
+            grid_width,
+            grid_height,
+            biggest_blocked_area,
+            grid,
+        )
+        if base_station is not None and add_base_station(
+                grid, base_station, grid_width, grid_height
+        ):
+            return base_station
         return None
 
 
 
-def mowing_time(speed_robot, autonomy_robot_seconds, cutting_diameter, total_area):
+# Robot configurations whose autonomy has already been reported as insufficient
+_reported_autonomies = set()
+
+
+@functools.lru_cache(maxsize=64)
+def mowing_seconds(speed_robot, cutting_diameter, total_area):
     """
-    Estimates the time required for the robot to mow a given area based on the robot's
-    speed, cutting diameter, and total area to mow.
+    Computes the time required for the robot to mow a given area. It only depends on the
+    robot and on the size of the tassels, so it is cached and computed once per run.
 
     :param speed_robot: Speed of the robot (units per second).
-    :param autonomy_robot_seconds: Robot's autonomy in seconds (battery life).
     :param cutting_diameter: Diameter of the cutting area.
     :param total_area: Total area to be mowed.
-    :return: Estimated time in seconds for the mowing operation.
+    :return: Time in seconds for the mowing operation.
     """
     cutting_width = cutting_diameter
 
@@ -294,10 +270,27 @@ def mowing_time(speed_robot, autonomy_robot_seconds, cutting_diameter, total_are
 
     total_distance = passes_needed * total_area / cutting_width
 
-    total_time_seconds = total_distance / speed_robot
+    return total_distance / speed_robot
 
-    if total_time_seconds > autonomy_robot_seconds:
-        print(f"Warning: The robot's autonomy might not be sufficient.")
+
+def mowing_time(speed_robot, autonomy_robot_seconds, cutting_diameter, total_area):
+    """
+    Estimates the time required for the robot to mow a given area based on the robot's
+    speed, cutting diameter, and total area to mow.
+
+    :param speed_robot: Speed of the robot (units per second).
+    :param autonomy_robot_seconds: Robot's autonomy in seconds (battery life).
+    :param cutting_diameter: Diameter of the cutting area.
+    :param total_area: Total area to be mowed.
+    :return: Estimated time in seconds for the mowing operation.
+    """
+    total_time_seconds = mowing_seconds(speed_robot, cutting_diameter, total_area)
+
+    # Evaluated for every cut tassel, so each configuration is only reported once
+    configuration = (speed_robot, autonomy_robot_seconds, cutting_diameter, total_area)
+    if total_time_seconds > autonomy_robot_seconds and configuration not in _reported_autonomies:
+        _reported_autonomies.add(configuration)
+        logging.warning("The robot's autonomy might not be sufficient.")
 
     return total_time_seconds
 
@@ -310,7 +303,7 @@ def euclidean_distance(p1: Tuple[int, int], p2: Tuple[int, int]) -> float:
     :param p2: Second point (x, y).
     :return: Euclidean distance between the two points.
     """
-    return math.sqrt((p1[0] - p2[0]) ** 2 + (p1[1] - p2[1]) ** 2)
+    return math.hypot(p1[0] - p2[0], p1[1] - p2[1])
 
 
 
@@ -321,18 +314,30 @@ def generate_biggest_center_pair(center_tassel, biggest_blocked_area):
     :param center_tassel: Coordinates of the central tassel (tuple of x, y).
     :param biggest_blocked_area: Coordinates of the largest blocked area.
     :return: Coordinates of the nearest point in the biggest blocked area (tuple of x, y).
+    :raises ValueError: If the biggest blocked area is empty.
     """
     if not biggest_blocked_area:
-        return None
+        raise ValueError("The biggest blocked area is empty")
 
-    nearest_tuple = min(
-        biggest_blocked_area, key=lambda pos: euclidean_distance(pos, center_tassel)
-    )
+    # Compare the squared distances to the center tassel in bulk; ties go to the first tassel
+    area = np.asarray(biggest_blocked_area)
+    deltas = area - np.asarray(center_tassel)
+    index = int(np.argmin(np.einsum("ij,ij->i", deltas, deltas)))
+
+    return tuple(biggest_blocked_area[index])
+
+
+class SimulationData(NamedTuple):
+    """
+    Robot, environment and simulator configuration loaded from a data file.
+    """
 
-    return nearest_tuple
+    robot: dict
+    env: dict
+    simulator: dict
 
 
-def load_data_from_file(file_path: str) -> Union[Tuple[dict, dict, dict], None]:
+def load_data_from_file(file_path: str) -> Union[SimulationData, None]:
     """
     Loads data from a JSON file and returns robot, environment, and simulator data.
 
@@ -345,7 +350,9 @@ def load_data_from_file(file_path: str) -> Union[Tuple[dict, dict, dict], None]:
     with open(file_path, "r") as json_file:
         data = json.load(json_file)
 
-    return data.get("robot", {}), data.get("env", {}), data.get("simulator", {})
+    return SimulationData(
+        data.get("robot", {}), data.get("env", {}), data.get("simulator", {})
+    )
 
 
 def put_station_guidelines(
@@ -405,23 +412,32 @@ def put_station_guidelines(
     return base_station_pos
 
 
-def contains_any_resource(
-        grid, pos: Tuple[int, int], resource_types: List, grid_width: int, grid_height: int
-) -> bool:
+def line_cells(
+        x1: int, y1: int, x2: int, y2: int, grid_width: int, grid_height: int
+) -> Tuple[Tuple[int, int], ...]:
     """
-    Checks if a position contains any resources from a specified list of resource types.
+    Rasterizes the segment between two points, excluding the end point, up to the first cell outside the grid.
 
-    :param grid: The grid object where cells are placed.
-    :param pos: The (x, y) position to check.
-    :param resource_types: A list of resource types to check for.
+    :param x1: The starting x-coordinate.
+    :param y1: The starting y-coordinate.
+    :param x2: The ending x-coordinate.
+    :param y2: The ending y-coordinate.
     :param grid_width: The width of the grid.
     :param grid_height: The height of the grid.
-    :return: True if any resource type is present, False otherwise.
+    :return: The cells crossed by the segment, in order.
     """
-    for rtype in resource_types:
-        if contains_resource(grid, pos, rtype, grid_width, grid_height):
-            return True
-    return False
+    # Rasterize the whole segment at once: one cell per step along the major axis
+    steps = max(abs(x2 - x1), abs(y2 - y1))
+    xs = np.rint(np.linspace(x1, x2, steps + 1)).astype(int)[:-1]
+    ys = np.rint(np.linspace(y1, y2, steps + 1)).astype(int)[:-1]
+
+    # The line stops at the first cell that falls outside the grid
+    inside = (xs >= 0) & (xs < grid_width) & (ys >= 0) & (ys < grid_height)
+    if not inside.all():
+        stop = int(np.argmin(inside))
+        xs, ys = xs[:stop], ys[:stop]
+
+    return tuple(zip(xs.tolist(), ys.tolist()))
 
 
 def draw_line(
@@ -439,45 +455,12 @@ def draw_line(
     :param grid_height: The height of the grid.
     :return: A set of cells that have been modified with guidelines.
     """
-    dx = abs(x2 - x1)
-    dy = abs(y2 - y1)
-
-    sx = 1 if x1 < x2 else -1
-    sy = 1 if y1 < y2 else -1
-
-    x, y = x1, y1
-
     cells_to_add = set()
-    err = dx - dy
 
-    while (x, y) != (x2, y2):
-        if within_bounds(grid_width, grid_height, (x, y)):
-            curr_cell = grid[x][y]
-            if curr_cell is not None and not contains_any_resource(
-                grid,
-                (x, y),
-                [
-                    CircledBlockedArea,
-                    SquaredBlockedArea,
-                    IsolatedArea,
-                    BaseStation,
-                    GuideLine,
-                ],
-                grid_width,
-                grid_height,
-            ):
-                cells_to_add.add((x, y))
-                add_resource(grid, GuideLine((x, y)), x, y, grid_width, grid_height)
-
-            e2 = 2 * err
-            if e2 > -dy:
-                err -= dy
-                x += sx
-            if e2 < dx:
-                err += dx
-                y += sy
-        else:
-            break
+    for x, y in line_cells(x1, y1, x2, y2, grid_width, grid_height):
+        if not grid.contains((x, y), GUIDELINE_BLOCKERS):
+            cells_to_add.add((x, y))
+            grid.place_agent(GuideLine((x, y)), (x, y))
 
     if within_bounds(grid_width, grid_height, (x2, y2)):
         cells_to_add.add((x2, y2))
@@ -486,37 +469,6 @@ def draw_line(
     return cells_to_add
 
 
-def contains_resource(
-        grid, cell: Tuple[int, int], resource, grid_width: int, grid_height: int
-) -> bool:
-    """
-    Checks if a specific resource is present in the specified cell on the grid.
-
-    :param grid: The grid object where cells are placed.
-    :param cell: The (x, y) coordinates of the cell.
-    :param resource: The type of resource to check for.
-    :param grid_width: The width of the grid.
-    :param grid_height: The height of the grid.
-    :return: True if the resource is present, False otherwise.
-    """
-    x, y = cell
-
-    # Ensure x and y are within bounds
-    if 0 <= x < grid_width and 0 <= y < grid_height:
-        cell_contents = grid.get_cell_list_contents(cell)
-
-        specific_agent = next(
-            (agent for agent in cell_contents if isinstance(agent, resource)), None
-        )
-
-        if specific_agent:
-            return True
-        else:
-            return False
-    else:
-        return False
-
-
 def add_base_station(
         grid, position: Tuple[int, int], grid_width: int, grid_height: int
 ) -> bool:
@@ -551,22 +503,8 @@ def set_guideline_cell(x: int, y: int, grid, grid_width: int, grid_height: int)
     if not within_bounds(grid_width, grid_height, (x, y)):
         return False
 
-    blocked_areas = [
-        CircledBlockedArea,
-        SquaredBlockedArea,
-        IsolatedArea,
-        BaseStation,
-        GuideLine,
-    ]
-
     # Check for existing resources at the wrapped cell
-    if not contains_any_resource(
-            grid,
-            (x, y),
-            blocked_areas,
-            grid_width,
-            grid_height,
-    ):
+    if not grid.contains((x, y), GUIDELINE_BLOCKERS):
         add_resource(grid, GuideLine((x, y)), x, y, grid_width, grid_height)
 
 
@@ -621,17 +559,35 @@ def find_farthest_point(grid_width: int, grid_height: int, fx: int, fy: int) ->
         (grid_width, grid_height),
     ]
 
+    # Squared distances order the points the same way, without the square root
     for point in eligible_points:
-        dist = euclidean_distance((fx, fy), point)
-        if dist > max_dist:
-            max_dist = dist
+        dist_sq = (fx - point[0]) ** 2 + (fy - point[1]) ** 2
+        if dist_sq > max_dist:
+            max_dist = dist_sq
             result = point
-            if dist > grid_width or dist > grid_height:  # Early return if very far
+            if dist_sq > grid_width ** 2 or dist_sq > grid_height ** 2:  # Early return if very far
                 return result
 
     return result
 
 
+@functools.lru_cache(maxsize=8)
+def perimeter_mask(grid_width: int, grid_height: int) -> np.ndarray:
+    """
+    Builds a boolean mask of the perimeter cells of a grid. The mask is cached per grid size and read-only.
+
+    :param grid_width: The width of the grid.
+    :param grid_height: The height of the grid.
+    :return: A (grid_width, grid_height) array that is True on the perimeter cells.
+    """
+    # Every perimeter cell once, corners included only a single time
+    perimeter = np.zeros((grid_width, grid_height), dtype=bool)
+    perimeter[[0, -1], :] = True
+    perimeter[:, [0, -1]] = True
+    perimeter.flags.writeable = False
+    return perimeter
+
+
 def populate_perimeter_guidelines(grid_width: int, grid_height: int, grid):
     """
     Populates the perimeter of the grid with guideline cells.
@@ -640,33 +596,23 @@ def populate_perimeter_guidelines(grid_width: int, grid_height: int, grid):
     :param grid_height: The height of the grid.
     :param grid: The grid object where cells are placed.
     """
-    for x in range(0, grid_height):
-        set_guideline_cell(x, 0, grid, grid_width, grid_height)
-
-    for x in range(0, grid_height):
-        set_guideline_cell(x, grid_width, grid, grid_width, grid_height)
-
-    for y in range(0, grid_width):
-        set_guideline_cell(0, y, grid, grid_width, grid_height)
+    perimeter = perimeter_mask(grid_width, grid_height)
 
-    for y in range(0, grid_width):
-        set_guideline_cell(grid_height, y, grid, grid_width, grid_height)
+    # Select the free perimeter cells with a single scan of the cell bitmasks
+    free = perimeter & ((grid.type_map() & GUIDELINE_BLOCKERS) == 0)
+    for x, y in np.argwhere(free).tolist():
+        grid.place_agent(GuideLine((x, y)), (x, y))
 
 
 def get_grass_tassel(grass_tassels, pos):
     """
     Retrieves a grass tassel at the specified position.
 
-    :param grass_tassels: A list of grass tassels.
+    :param grass_tassels: A dictionary of grass tassels keyed by their position.
     :param pos: The (x, y) position to search for the tassel.
     :return: The grass tassel at the given position, or None if not found.
     """
-    for res in grass_tassels:
-
-        if res.get() == pos:
-            return res
-
-    return None
+    return grass_tassels.get(pos)
 
 
 def find_central_tassel(rows: int, cols: int) -> Tuple[int, int]:
@@ -687,6 +633,27 @@ def find_central_tassel(rows: int, cols: int) -> Tuple[int, int]:
         return central_row, central_col
 
 
+def find_largest_blocked_area(grid) -> Union[List[Tuple[int, int]], None]:
+    """
+    Finds the largest connected region of blocked cells in the grid.
+
+    :param grid: The grid object where cells are placed.
+    :return: The coordinates of the cells of the largest blocked area, or None if there is no blocked cell.
+    """
+    blocked = (
+        grid.type_map() & resource_mask([SquaredBlockedArea, CircledBlockedArea])
+    ) != 0
+
+    # Label the connected blocked regions and keep the one with the most cells
+    labels, count = ndimage.label(blocked)
+    if count == 0:
+        return None
+
+    sizes = np.bincount(labels.ravel())
+    sizes[0] = 0  # Label 0 is the background
+    return [tuple(cell) for cell in np.argwhere(labels == sizes.argmax()).tolist()]
+
+
 def profile_code(func):
     """
     Profiles the execution time of a function.
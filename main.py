@@ -1,3 +1,4 @@
+import argparse
 import sys
 
 from Model.starter import Starter
@@ -10,29 +11,23 @@ def parse_cli(argv):
       argv: The list of command line arguments.
 
     Returns:
-      A dictionary of parsed arguments.
+      The names of the environment plugins and of the robot plugins.
     """
-
-    # Get the arguments following the script name.
-    args = argv[1:]
-
-    # Parse the arguments.
-    parsed_args = {}
-    e_plugins = {}
-    r_plugins = {}
-
-    for arg in args:
-        if arg.startswith("--"):
-            key, value = arg.split("--")
-            parsed_args[key] = value
-
-            if key == "e":
-                e_plugins[value] = True
-            elif key == "r":
-                r_plugins[value] = True
+    parser = argparse.ArgumentParser(prog=argv[0])
+    parser.add_argument(
+        "--e", action="append", default=[], metavar="PLUGIN",
+        help="name of an environment plugin (repeatable)",
+    )
+    parser.add_argument(
+        "--r", action="append", default=[], metavar="PLUGIN",
+        help="name of a robot plugin (repeatable)",
+    )
+
+    # Parse the arguments following the script name.
+    args = parser.parse_args(argv[1:])
 
     # Return the parsed arguments.
-    return e_plugins, r_plugins
+    return args.e, args.r
 
 
 if __name__ == "__main__":
@@ -0,0 +1,170 @@
+""" Copyright 2024 Sara Grecu
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+     https://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License."""
+
+
+import random
+
+import numpy as np
+import pytest
+from scipy.spatial import KDTree
+
+from Controller.environment_plugin import (
+    add_squared_area,
+    circular_isolation,
+    disk_mask,
+    fill_circular_blocked_area,
+    find_and_draw_lines,
+)
+from Model.agents import (
+    CircledBlockedArea,
+    GuideLine,
+    IsolatedArea,
+    Opening,
+    SquaredBlockedArea,
+)
+from Model.grid import ResourceGrid, resource_mask
+from Utils.utils import perimeter_mask
+
+
+def cells_with(grid, resource_type):
+    """
+    Collect the cells that hold a resource type.
+
+    :param grid: The grid.
+    :param resource_type: The resource class.
+    :return: The set of (x, y) cells.
+    """
+    found = (grid.type_map() & resource_mask([resource_type])) != 0
+    return {tuple(cell) for cell in np.argwhere(found).tolist()}
+
+
+@pytest.mark.parametrize("radius", range(8))
+def test_disk_mask_matches_the_distance_check(radius):
+    mask = disk_mask(radius)
+    expected = [
+        [((i - radius) ** 2 + (j - radius) ** 2) ** 0.5 <= radius for j in range(2 * radius + 1)]
+        for i in range(2 * radius + 1)
+    ]
+
+    assert mask.tolist() == expected
+    assert not mask.flags.writeable
+
+
+def test_fill_circular_blocked_area_matches_the_full_scan():
+    # The previous implementation scanned every cell of a square grid for the disk
+    rng = random.Random(11)
+    size = 20
+    for _ in range(60):
+        start_x, start_y = rng.randrange(-5, size + 5), rng.randrange(-5, size + 5)
+        rad, dim_tassel = rng.randrange(0, 12), rng.choice([1, 2, 3])
+        grid = ResourceGrid(size, size, torus=False)
+
+        fill_circular_blocked_area(start_x, start_y, rad, grid, size, size, dim_tassel)
+
+        expected = {
+            (i, j)
+            for i in range(size)
+            for j in range(size)
+            if ((i - start_x) ** 2 + (j - start_y) ** 2) ** 0.5 <= int(rad / dim_tassel)
+        }
+        assert cells_with(grid, CircledBlockedArea) == expected
+
+
+def test_add_squared_area_blocks_the_rectangle_away_from_openings():
+    grid = ResourceGrid(12, 10, torus=False)
+    grid.place_agent(Opening((9, 4)), (9, 4))
+    assert len(grid.empties) == 12 * 10 - 1  # Mesa's empties set is built from here on
+
+    # Equal bounds give no variance, so the rectangle spans 5 x 4 tassels from (4, 2)
+    blocked = add_squared_area(4, 2, 5, 4, 5, 4, grid, 12, 10, 1)
+
+    expected = {
+        (x, y)
+        for x in range(4, 9)
+        for y in range(2, 6)
+        if max(abs(x - 9), abs(y - 4)) > 1
+    }
+    assert set(blocked) == expected
+    assert cells_with(grid, SquaredBlockedArea) == expected
+    assert all(
+        any(isinstance(content, SquaredBlockedArea) for content in grid[x][y])
+        for x, y in expected
+    )
+    assert not expected & set(grid.empties)
+
+
+def test_find_and_draw_lines_reaches_the_nearest_perimeter_cell():
+    # Reference: a KDTree over the neighbors, queried from every perimeter cell
+    rng = random.Random(13)
+    for _ in range(200):
+        width, height = rng.randrange(3, 15), rng.randrange(3, 15)
+        neighbors = list({
+            (rng.randrange(width), rng.randrange(height)) for _ in range(rng.randrange(1, 6))
+        })
+        perimeter = [tuple(cell) for cell in np.argwhere(perimeter_mask(width, height)).tolist()]
+        grid = ResourceGrid(width, height, torus=False)
+
+        find_and_draw_lines(grid, neighbors, width, height)
+
+        drawn = cells_with(grid, GuideLine)
+        if any(neighbor in perimeter for neighbor in neighbors):
+            assert not drawn
+            continue
+
+        expected_distance = min(KDTree(neighbors).query(perimeter)[0])
+        reached = [cell for cell in perimeter if cell in drawn]
+        assert len(reached) == 1
+        assert min(
+            np.hypot(reached[0][0] - x, reached[0][1] - y) for x, y in neighbors
+        ) == pytest.approx(expected_distance)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_circular_isolation_opens_the_rim(seed):
+    random.seed(seed)
+    size, radius = 16, random.randrange(1, 7)
+    x_start, y_start = random.randrange(-3, size + 3), random.randrange(-3, size + 3)
+    grid = ResourceGrid(size, size, torus=False)
+
+    point = circular_isolation(grid, radius, x_start, y_start, 3, size, size)
+
+    disk = {
+        (x_start + i, y_start + j)
+        for i, j in (np.argwhere(disk_mask(radius)) - radius).tolist()
+    }
+    inside = {cell for cell in disk if 0 <= cell[0] < size and 0 <= cell[1] < size}
+    rim = {
+        (x, y)
+        for x, y in inside
+        if not {(x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)} <= disk
+    }
+
+    assert cells_with(grid, IsolatedArea) == inside
+    if not rim:
+        assert point is None
+        return
+    openings = cells_with(grid, Opening)
+    assert point in rim
+    assert openings <= rim
+    assert 1 <= len(openings) <= 3
+
+    # Every opening is adjacent to the previous one, even where the grid clips the rim
+    reached, frontier = set(), [min(openings)]
+    while frontier:
+        x, y = frontier.pop()
+        reached.add((x, y))
+        frontier.extend(
+            cell for cell in openings - reached if max(abs(cell[0] - x), abs(cell[1] - y)) <= 1
+        )
+    assert reached == openings
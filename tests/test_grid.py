@@ -0,0 +1,119 @@
+""" Copyright 2024 Sara Grecu
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+     https://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License."""
+
+
+import random
+
+from Model.agents import (
+    BaseStation,
+    GuideLine,
+    SquaredBlockedArea,
+    CircledBlockedArea,
+    IsolatedArea,
+    Opening,
+)
+from Model.grid import RESOURCE_BITS, ResourceGrid, resource_bit, resource_mask
+
+RESOURCE_TYPES = [
+    BaseStation,
+    GuideLine,
+    SquaredBlockedArea,
+    CircledBlockedArea,
+    IsolatedArea,
+    Opening,
+]
+
+
+def rebuilt_bitmasks(grid):
+    """
+    Rebuild the cell bitmasks from the cell contents, as isinstance checks would see them.
+
+    :param grid: The grid.
+    :return: The bitmasks as a list indexed like grid.cell_types.
+    """
+    return [
+        resource_mask(type(content) for content in grid[x][y])
+        for x in range(grid.width)
+        for y in range(grid.height)
+    ]
+
+
+def test_bitmasks_follow_random_placements_and_removals():
+    rng = random.Random(3)
+    grid = ResourceGrid(7, 5, torus=False)
+    placed = []
+
+    for _ in range(400):
+        if placed and rng.random() < 0.4:
+            grid.remove_agent(placed.pop(rng.randrange(len(placed))))
+        else:
+            pos = (rng.randrange(grid.width), rng.randrange(grid.height))
+            resource = rng.choice(RESOURCE_TYPES)(pos)
+            grid.place_agent(resource, pos)
+            placed.append(resource)
+
+        assert grid.cell_types.tolist() == rebuilt_bitmasks(grid)
+
+
+def test_place_resources_matches_place_agent():
+    rng = random.Random(5)
+    batch, single = ResourceGrid(6, 9, torus=False), ResourceGrid(6, 9, torus=False)
+    positions = [(rng.randrange(6), rng.randrange(9)) for _ in range(40)]
+    types = [rng.choice(RESOURCE_TYPES) for _ in positions]
+
+    # Build Mesa's empties set first, so that both grids have to keep it current
+    assert len(batch.empties) == len(single.empties) == 6 * 9
+
+    resources = [rtype(pos) for rtype, pos in zip(types, positions)]
+    batch.place_resources(resources)
+    for rtype, pos in zip(types, positions):
+        single.place_agent(rtype(pos), pos)
+
+    assert batch.cell_types.tolist() == single.cell_types.tolist()
+    assert batch.cell_types.tolist() == rebuilt_bitmasks(batch)
+    assert sorted(batch.empties) == sorted(single.empties)
+    assert batch.exists_empty_cells() == single.exists_empty_cells()
+    if hasattr(single, "empty_mask"):  # Mesa 2.2 and later
+        assert batch.empty_mask.tolist() == single.empty_mask.tolist()
+    assert all(
+        resource.pos == pos and resource in batch[pos[0]][pos[1]]
+        for resource, pos in zip(resources, positions)
+    )
+
+
+def test_contains_and_type_map_use_the_cell_layout():
+    grid = ResourceGrid(4, 3, torus=False)
+    grid.place_agent(Opening((3, 1)), (3, 1))
+
+    assert grid.contains((3, 1), resource_mask([Opening, GuideLine]))
+    assert not grid.contains((3, 1), resource_mask([GuideLine]))
+    assert not grid.contains((4, 1), resource_mask([Opening]))
+    assert grid.type_map().shape == (4, 3)
+    assert grid.type_map()[3, 1] == RESOURCE_BITS[Opening]
+
+
+def test_resource_bit_is_inherited_by_subclasses():
+    class Gate(Opening):
+        pass
+
+    assert resource_bit(Gate) == RESOURCE_BITS[Opening]
+    assert resource_bit(int) == 0
+
+    grid = ResourceGrid(3, 3, torus=False)
+    gate = Gate((1, 1))
+    grid.place_agent(gate, (1, 1))
+    assert grid.contains((1, 1), resource_mask([Opening]))
+
+    grid.remove_agent(gate)
+    assert grid.cell_types.tolist() == [0] * 9
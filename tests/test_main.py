@@ -0,0 +1,76 @@
+""" Copyright 2024 Sara Grecu
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+     https://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License."""
+
+
+import sys
+import types
+
+from main import parse_cli
+from Model import starter
+from Model.starter import _initialize_plugins, execute_plugins, runner
+
+
+class EchoEnvironmentPlugin:
+    def __init__(self, grid_width, grid_height):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+
+    def begin(self):
+        return ("grid", self.grid_width, self.grid_height), (0, 0)
+
+
+class EchoRobotPlugin:
+    def __init__(self, grid, base_station_pos):
+        self.grid = grid
+        self.base_station_pos = base_station_pos
+
+
+def install_plugin(monkeypatch, plugin_class):
+    module = types.ModuleType(f"Controller.{plugin_class.__name__}")
+    setattr(module, plugin_class.__name__, plugin_class)
+    monkeypatch.setitem(sys.modules, module.__name__, module)
+
+
+def test_plugins_named_on_the_command_line_are_loaded(monkeypatch):
+    install_plugin(monkeypatch, EchoEnvironmentPlugin)
+    install_plugin(monkeypatch, EchoRobotPlugin)
+
+    env_names, robot_names = parse_cli(
+        ["main.py", "--e", "EchoEnvironmentPlugin", "--r", "EchoRobotPlugin", "--r", "MissingPlugin"]
+    )
+    env_plugins = _initialize_plugins(env_names)
+    robot_plugins = _initialize_plugins(robot_names)
+
+    # The environment plugin builds the grid
+    assert execute_plugins(env_plugins, 4, 3) == (("grid", 4, 3), (0, 0))
+
+    # The robot plugin drives the simulator; a plugin that cannot be imported is logged and skipped
+    assert len(robot_plugins) == 1
+    simulated = []
+    monkeypatch.setattr(starter, "process_grid_data", lambda *args: None)
+    monkeypatch.setattr(
+        starter,
+        "Simulator",
+        lambda grid, cycles, base_station_pos, plugin, *args: types.SimpleNamespace(
+            step=lambda: simulated.append(plugin)
+        ),
+    )
+    runner(
+        robot_plugins[0], "grid", 1, (0, 0), {"cutting_mode": "random-random", "speed": 1, "autonomy": 10},
+        4, 3, 0, 0, [], "test.csv", 1, 0,
+    )
+
+    assert len(simulated) == 1
+    assert isinstance(simulated[0], EchoRobotPlugin)
+    assert (simulated[0].grid, simulated[0].base_station_pos) == ("grid", (0, 0))
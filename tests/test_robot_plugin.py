@@ -0,0 +1,103 @@
+""" Copyright 2024 Sara Grecu
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+     https://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License."""
+
+
+import random
+
+from Controller.robot_plugin import DefaultMovementPlugin, is_enclosed
+from Model.agents import GuideLine, IsolatedArea
+from Model.grid import ResourceGrid
+from Model.model import Simulator
+
+GRID_WIDTH, GRID_HEIGHT = 10, 8
+
+
+def make_simulator(grid, base_station_pos=(0, 0)):
+    """
+    Build a simulator with the random movement plugin on the given grid.
+
+    :param grid: The grid to simulate on.
+    :param base_station_pos: The starting position of the robot.
+    :return: The simulator and its movement plugin.
+    """
+    plugin = DefaultMovementPlugin(
+        "random", grid, base_station_pos, "random", 1, GRID_WIDTH, GRID_HEIGHT, 1
+    )
+    simulator = Simulator(
+        grid, 10 ** 6, base_station_pos, plugin, 1, 10 ** 6, 0, 0, [], "test.csv", 1, 0
+    )
+    return simulator, plugin
+
+
+def isolated_grid():
+    """
+    Build a grid with a 3x3 isolated area without openings in its middle.
+
+    :return: The grid.
+    """
+    grid = ResourceGrid(GRID_WIDTH, GRID_HEIGHT, torus=False)
+    for x in range(4, 7):
+        for y in range(2, 5):
+            grid.place_agent(IsolatedArea((x, y)), (x, y))
+    return grid
+
+
+def step_towards(simulator, plugin, pos, direction):
+    """
+    Place the robot on a cell, heading in a direction, and make it move once.
+
+    :param simulator: The simulator.
+    :param plugin: The movement plugin of the robot.
+    :param pos: The cell the robot starts from.
+    :param direction: The direction of the robot.
+    """
+    robot = simulator.robot
+    simulator.grid.move_agent(robot, pos)
+    plugin.pos = pos
+    robot.dir = direction
+    robot.not_first()
+    robot.step()
+
+
+def test_robot_bounces_off_an_enclosed_cell():
+    simulator, plugin = make_simulator(isolated_grid())
+
+    # Heading right from (3, 3), the next cell (4, 3) is enclosed
+    step_towards(simulator, plugin, (3, 3), (1, 0))
+
+    assert simulator.robot.pos == (3, 3)
+    assert plugin.pos == (3, 3)  # Moved back by one tassel
+    assert simulator.robot.dir == plugin.up_sx_tassel[(1, 0)]  # Random bounce turns the direction
+
+
+def test_guideline_lets_the_robot_enter_an_isolated_cell():
+    grid = isolated_grid()
+    simulator, plugin = make_simulator(grid)
+
+    # Entering (4, 3) heading right, the guideline check looks one tassel aside of it
+    dx = plugin.dx_tassel[(1, 0)]
+    grid.place_agent(GuideLine((4 + dx[0], 3 + dx[1])), (4 + dx[0], 3 + dx[1]))
+    step_towards(simulator, plugin, (3, 3), (1, 0))
+
+    assert simulator.robot.pos == (4, 3)
+
+
+def test_random_walk_never_enters_an_enclosed_cell():
+    grid = isolated_grid()
+    simulator, _ = make_simulator(grid)
+    random.seed(7)
+
+    for _ in range(200):
+        simulator.robot.step()
+        assert not is_enclosed(grid, simulator.robot.pos)
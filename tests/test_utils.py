@@ -0,0 +1,254 @@
+""" Copyright 2024 Sara Grecu
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+     https://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License."""
+
+
+import json
+import logging
+import math
+import random
+from collections import deque
+
+import numpy as np
+import pytest
+
+from Model.agents import (
+    BaseStation,
+    GuideLine,
+    SquaredBlockedArea,
+    CircledBlockedArea,
+    IsolatedArea,
+)
+from Model.grid import ResourceGrid, resource_mask
+from Utils.utils import (
+    draw_line,
+    find_largest_blocked_area,
+    generate_biggest_center_pair,
+    line_cells,
+    load_data_from_file,
+    mowing_time,
+    perimeter_mask,
+    populate_perimeter_guidelines,
+)
+
+OBSTACLES = [CircledBlockedArea, SquaredBlockedArea, IsolatedArea, BaseStation, GuideLine]
+
+
+def bresenham_cells(x1, y1, x2, y2, grid_width, grid_height):
+    """
+    The cells visited by the previous Bresenham draw_line, excluding the end point,
+    up to the first cell outside the grid.
+    """
+    dx, dy = abs(x2 - x1), abs(y2 - y1)
+    sx, sy = (1 if x1 < x2 else -1), (1 if y1 < y2 else -1)
+    x, y, err = x1, y1, dx - dy
+    cells = []
+    while (x, y) != (x2, y2):
+        if not (0 <= x < grid_width and 0 <= y < grid_height):
+            break
+        cells.append((x, y))
+        e2 = 2 * err
+        if e2 > -dy:
+            err -= dy
+            x += sx
+        if e2 < dx:
+            err += dx
+            y += sy
+    return cells
+
+
+def has_half_cell_tie(x1, y1, x2, y2):
+    """
+    Whether the segment passes exactly halfway between two cells of its minor axis,
+    where Bresenham and rounding may pick different cells.
+    """
+    steps = max(abs(x2 - x1), abs(y2 - y1))
+    minor = min(abs(x2 - x1), abs(y2 - y1))
+    return steps > 0 and any(2 * minor * k % (2 * steps) == steps for k in range(steps + 1))
+
+
+def flood_fill_largest_area(grid):
+    """
+    The largest 4-connected region of blocked cells, found with a breadth-first flood fill.
+    """
+    blocked = resource_mask([SquaredBlockedArea, CircledBlockedArea])
+    seen, largest = set(), []
+    for x in range(grid.width):
+        for y in range(grid.height):
+            if (x, y) in seen or not grid.contains((x, y), blocked):
+                continue
+            region, queue = [], deque([(x, y)])
+            seen.add((x, y))
+            while queue:
+                cx, cy = queue.popleft()
+                region.append((cx, cy))
+                for nx, ny in ((cx - 1, cy), (cx + 1, cy), (cx, cy - 1), (cx, cy + 1)):
+                    if (nx, ny) not in seen and grid.contains((nx, ny), blocked):
+                        seen.add((nx, ny))
+                        queue.append((nx, ny))
+            if len(region) > len(largest):
+                largest = region
+    return largest or None
+
+
+def test_load_data_from_file_does_not_cache_a_missing_file(tmp_path):
+    data_file = tmp_path / "data_file"
+    assert load_data_from_file(str(data_file)) is None
+
+    data_file.write_text(json.dumps({"robot": {"speed": 1}}))
+    assert load_data_from_file(str(data_file)).robot == {"speed": 1}
+
+
+def test_load_data_from_file_returns_independent_copies(tmp_path):
+    data_file = tmp_path / "data_file"
+    data_file.write_text(json.dumps({"env": {"circles": [[1, 2, 3]]}}))
+
+    first = load_data_from_file(str(data_file))
+    first.env["circles"].append([4, 5, 6])
+
+    assert load_data_from_file(str(data_file)).env == {"circles": [[1, 2, 3]]}
+
+
+def test_mowing_time_warns_once_about_an_insufficient_autonomy(caplog):
+    with caplog.at_level(logging.WARNING):
+        for _ in range(3):
+            mowing_time(1, 1, 7, 13)
+        mowing_time(1, 10 ** 6, 7, 13)
+
+    assert [record.message for record in caplog.records] == [
+        "The robot's autonomy might not be sufficient."
+    ]
+
+
+def test_line_cells_matches_bresenham_away_from_ties():
+    rng = random.Random(17)
+    for _ in range(3000):
+        x1, y1, x2, y2 = (rng.randrange(-5, 35) for _ in range(4))
+        cells = list(line_cells(x1, y1, x2, y2, 30, 30))
+        reference = bresenham_cells(x1, y1, x2, y2, 30, 30)
+
+        if not has_half_cell_tie(x1, y1, x2, y2):
+            assert cells == reference
+            continue
+
+        # On a tie both rasterizations are valid: same length, within half a cell of the segment
+        unclipped = [
+            (x - 50, y - 50) for x, y in line_cells(x1 + 50, y1 + 50, x2 + 50, y2 + 50, 100, 100)
+        ]
+        assert len(unclipped) == len(bresenham_cells(x1 + 50, y1 + 50, x2 + 50, y2 + 50, 100, 100))
+        steps = max(abs(x2 - x1), abs(y2 - y1))
+        for k, (x, y) in enumerate(unclipped):
+            assert abs(x - (x1 + (x2 - x1) * k / steps)) <= 0.5
+            assert abs(y - (y1 + (y2 - y1) * k / steps)) <= 0.5
+
+        # The grid cuts the line at its first cell outside
+        inside = [0 <= x < 30 and 0 <= y < 30 for x, y in unclipped] + [False]
+        assert cells == unclipped[:inside.index(False)]
+
+
+def test_draw_line_matches_the_bresenham_guidelines():
+    rng = random.Random(19)
+    size = 12
+    tested = 0
+    while tested < 300:
+        x1, y1, x2, y2 = (rng.randrange(-3, size + 3) for _ in range(4))
+        if has_half_cell_tie(x1, y1, x2, y2):
+            continue
+        tested += 1
+
+        obstacles = [
+            (rng.choice(OBSTACLES), (rng.randrange(size), rng.randrange(size)))
+            for _ in range(15)
+        ]
+        grid, reference = ResourceGrid(size, size, torus=False), ResourceGrid(size, size, torus=False)
+        for rtype, pos in obstacles:
+            grid.place_agent(rtype(pos), pos)
+            reference.place_agent(rtype(pos), pos)
+
+        drawn = draw_line(x1, y1, x2, y2, grid, size, size)
+
+        expected = set()
+        for x, y in bresenham_cells(x1, y1, x2, y2, size, size):
+            if not reference.contains((x, y), resource_mask(OBSTACLES)):
+                expected.add((x, y))
+                reference.place_agent(GuideLine((x, y)), (x, y))
+        if 0 <= x2 < size and 0 <= y2 < size:
+            expected.add((x2, y2))
+            reference.place_agent(GuideLine((x2, y2)), (x2, y2))
+
+        assert drawn == expected
+        assert grid.cell_types.tolist() == reference.cell_types.tolist()
+
+
+@pytest.mark.parametrize("width, height", [(1, 1), (1, 5), (4, 1), (2, 2), (5, 3), (3, 7)])
+def test_perimeter_mask_covers_the_border_cells(width, height):
+    mask = perimeter_mask(width, height)
+    expected = [
+        [x in (0, width - 1) or y in (0, height - 1) for y in range(height)]
+        for x in range(width)
+    ]
+
+    assert mask.tolist() == expected
+    assert not mask.flags.writeable
+
+
+def test_populate_perimeter_guidelines_skips_occupied_cells():
+    grid = ResourceGrid(6, 4, torus=False)
+    grid.place_agent(BaseStation((0, 2)), (0, 2))
+    grid.place_agent(IsolatedArea((5, 3)), (5, 3))
+    grid.place_agent(SquaredBlockedArea((2, 2)), (2, 2))
+
+    populate_perimeter_guidelines(6, 4, grid)
+
+    guidelines = (grid.type_map() & resource_mask([GuideLine])) != 0
+    expected = np.array(perimeter_mask(6, 4))
+    expected[0, 2] = expected[5, 3] = False
+    assert guidelines.tolist() == expected.tolist()
+
+
+@pytest.mark.parametrize("size", [1, 5, 31, 32, 100])
+def test_generate_biggest_center_pair_matches_the_nearest_cell(size):
+    rng = random.Random(size)
+    for _ in range(50):
+        area = [(rng.randrange(20), rng.randrange(20)) for _ in range(size)]
+        center = (rng.randrange(20), rng.randrange(20))
+
+        assert generate_biggest_center_pair(center, area) == min(
+            area, key=lambda pos: math.dist(pos, center)
+        )
+
+
+def test_generate_biggest_center_pair_rejects_an_empty_area():
+    with pytest.raises(ValueError):
+        generate_biggest_center_pair((0, 0), [])
+
+
+def test_find_largest_blocked_area_matches_the_flood_fill():
+    rng = random.Random(23)
+    for _ in range(100):
+        width, height = rng.randrange(1, 15), rng.randrange(1, 15)
+        grid = ResourceGrid(width, height, torus=False)
+        density = rng.random()
+        for x in range(width):
+            for y in range(height):
+                if rng.random() < density:
+                    rtype = rng.choice([SquaredBlockedArea, CircledBlockedArea, IsolatedArea])
+                    grid.place_agent(rtype((x, y)), (x, y))
+
+        largest = find_largest_blocked_area(grid)
+        reference = flood_fill_largest_area(grid)
+
+        if reference is None:
+            assert largest is None
+        else:
+            assert sorted(largest) == sorted(reference)